@@ -1,6 +1,5 @@
 from atlassian import Confluence
 import markdown2
-from functools import lru_cache
 import logging
 import time
 
@@ -8,6 +7,11 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
 class ConfluenceAPI:
+    # Default maximum storage HTML body size in characters; larger pages are split into child pages
+    DEFAULT_MAX_BODY_SIZE = 1000000
+    # Page property recording the wiki revision a page was last migrated from
+    MIGRATION_PROPERTY = 'wiki2confluence'
+
     def __init__(self, url, username, api_token, rate_limit=2):
         self.confluence = Confluence(
             url=url,
@@ -17,6 +21,8 @@ class ConfluenceAPI:
         )
         self.rate_limit = rate_limit
         self.last_request_time = 0
+        # Only ids of pages known to exist are cached, so a page created later in the run is found
+        self._page_ids = {}
 
     def rate_limit_request(self):
         current_time = time.time()
@@ -25,16 +31,18 @@ class ConfluenceAPI:
             time.sleep((1.0 / self.rate_limit) - time_since_last_request)
         self.last_request_time = time.time()
 
-    @lru_cache(maxsize=1000)
     def markdown_to_html(self, markdown_content):
+        # Not cached: callers size or split the storage HTML before upload and release it afterwards
         return markdown2.markdown(markdown_content)
 
-    @lru_cache(maxsize=1000)
     def get_page_id(self, space, title):
+        if (space, title) in self._page_ids:
+            return self._page_ids[(space, title)]
         self.rate_limit_request()
         try:
             page = self.confluence.get_page_by_title(space, title)
             if page:
+                self._page_ids[(space, title)] = page['id']
                 return page['id']
             return None
         except Exception as e:
@@ -42,10 +50,11 @@ class ConfluenceAPI:
             return None
 
     def create_or_update_page(self, space, title, body, parent_id):
+        """
+        Create or update a page from a storage HTML body. Returns the page ID or None on error.
+        """
         self.rate_limit_request()
         try:
-            html_body = self.markdown_to_html(body)
-
             existing_page_id = self.get_page_id(space, title)
 
             max_retries = 3
@@ -55,7 +64,7 @@ class ConfluenceAPI:
                         page = self.confluence.update_page(
                             page_id=existing_page_id,
                             title=title,
-                            body=html_body,
+                            body=body,
                             parent_id=parent_id,
                             type='page',
                             representation='storage'
@@ -65,12 +74,13 @@ class ConfluenceAPI:
                         page = self.confluence.create_page(
                             space=space,
                             title=title,
-                            body=html_body,
+                            body=body,
                             parent_id=parent_id,
                             type='page',
                             representation='storage'
                         )
                         logger.info(f"Created page '{title}' (ID: {page['id']})")
+                        self._page_ids[(space, title)] = page['id']
                     return page['id']
                 except Exception as e:
                     error_message = str(e)
@@ -86,6 +96,68 @@ class ConfluenceAPI:
             logger.error(f"Error creating or updating Confluence page '{title}': {e}")
             return None
 
+    def get_space_index(self, space, limit=100):
+        """
+        Return a dict mapping page title to its id, migrated wiki revision and migration
+        property version for every page in a space, or None if the index could not be
+        fetched completely.
+        """
+        index = {}
+        start = 0
+        expand = f"metadata.properties.{self.MIGRATION_PROPERTY}"
+        try:
+            # The server may return fewer results than requested, so page until an empty result
+            while True:
+                self.rate_limit_request()
+                pages = self.confluence.get_all_pages_from_space(space, start=start, limit=limit, expand=expand)
+                if not pages:
+                    return index
+                for page in pages:
+                    prop = page.get('metadata', {}).get('properties', {}).get(self.MIGRATION_PROPERTY, {})
+                    index[page['title']] = {
+                        "id": page['id'],
+                        "revid": prop.get('value', {}).get('revid'),
+                        "property_version": prop.get('version', {}).get('number')
+                    }
+                    self._page_ids[(space, page['title'])] = page['id']
+                start += len(pages)
+        except Exception as e:
+            logger.error(f"Error fetching page index for space '{space}' after {len(index)} pages: {e}")
+            return None
+
+    def set_migrated_revid(self, page_id, revid, property_version=None):
+        """
+        Record the wiki revision a page was migrated from. Returns True on success.
+        """
+        self.rate_limit_request()
+        data = {"key": self.MIGRATION_PROPERTY, "value": {"revid": revid}}
+        try:
+            if property_version:
+                data["version"] = {"number": property_version + 1}
+                self.confluence.update_page_property(page_id, data)
+            else:
+                self.confluence.set_page_property(page_id, data)
+            return True
+        except Exception as e:
+            logger.error(f"Error recording migrated revision for page ID '{page_id}': {e}")
+            return False
+
+    def remove_page(self, space, title):
+        """
+        Remove a page by its title. Returns True if the page was removed.
+        """
+        page_id = self.get_page_id(space, title)
+        if not page_id:
+            return False
+        self.rate_limit_request()
+        try:
+            self.confluence.remove_page(page_id)
+            self._page_ids.pop((space, title), None)
+            return True
+        except Exception as e:
+            logger.error(f"Error removing page '{title}': {e}")
+            return False
+
     def verify_page_exists(self, page_id):
         """
         Verify if a page exists by its ID.
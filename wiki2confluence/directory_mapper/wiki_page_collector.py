@@ -53,6 +53,44 @@ class WikiPageCollector:
                 break
         return all_pages
 
+    def collect_page_info(self):
+        """
+        Fetch size and revision metadata for all pages in bulk, without page content.
+        Returns None if the list could not be fetched completely.
+        """
+        page_info = []
+        continue_params = {}
+        while True:
+            params = {
+                "action": "query",
+                "generator": "allpages",
+                "gaplimit": "max",
+                "prop": "info",
+                "format": "json"
+            }
+            params.update(continue_params)
+            try:
+                response = self.session.get(self.api_url, params=params, verify=self.verify_ssl)
+                response.raise_for_status()
+                data = response.json()
+
+                for page in data.get('query', {}).get('pages', {}).values():
+                    page_info.append({
+                        "title": page['title'],
+                        "normalized_title": self.wiki_api.normalize_title(page['title']),
+                        "length": page.get('length', 0),
+                        "lastrevid": page.get('lastrevid')
+                    })
+
+                if 'continue' in data:
+                    continue_params = data['continue']
+                else:
+                    break
+            except requests.RequestException as e:
+                self.logger.error(f"Error fetching page info after {len(page_info)} pages: {e}")
+                return None
+        return page_info
+
     def save_pages_to_file(self, pages, filename):
         """
         Save the list of pages to a text file, add a page count, and list unprocessed pages.
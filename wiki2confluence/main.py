@@ -2,14 +2,18 @@ import yaml
 import os
 import sys
 import logging
+import argparse
 from directory_mapper.wiki_page_collector import WikiPageCollector
 from wiki_api import WikiAPI
 from wiki_converter import WikiConverter
 from confluence_api import ConfluenceAPI
+from migration_planner import MigrationPlanner
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+CHILDREN_MACRO = '<ac:structured-macro ac:name="children" />'
+
 def load_config():
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,37 +24,196 @@ def load_config():
         logger.error(f"Failed to load config: {e}")
         raise
 
-def process_page(wiki_api, confluence_api, page_title, config, parent_id):
-    try:
-        normalized_title = wiki_api.normalize_title(page_title)
-        
-        wiki_content = wiki_api.get_wiki_content(normalized_title)
-        if wiki_content == "":
-            logger.info(f"Page '{normalized_title}' is empty or not found. Creating new page with placeholder content.")
-            wiki_content = f"# {page_title}\n\nThis page is currently empty or was not found in the original wiki."
+def placeholder_content(page_title):
+    return f"# {page_title}\n\nThis page is currently empty or was not found in the original wiki."
 
-        html_content = wiki_api.convert_to_html(wiki_content)
-        if not html_content:
-            logger.error(f"Failed to convert content to HTML for page: {normalized_title}")
-            return False
+def render_page(wiki_api, normalized_title, page_title, config):
+    """
+    Return (html_content, sections) for a page, or (None, None) on failure.
 
-        markdown_content = WikiConverter.wiki_to_markdown(html_content)
-        if not markdown_content:
-            logger.error(f"Failed to convert content to Markdown for page: {normalized_title}")
-            return False
+    In 'title' render mode the page is rendered server-side by title in one request,
+    otherwise the wikitext is downloaded and then uploaded for conversion.
+    """
+    render_mode = config.get('mediawiki', {}).get('render_mode', 'wikitext')
 
-        confluence_title = normalized_title.replace('_', ' ')
+    if render_mode == 'title':
+        parsed = wiki_api.parse_page(normalized_title)
+        if parsed is None:
+            return None, None
+        if parsed and not WikiConverter.is_empty_html(parsed['html'], parsed['sections']):
+            logger.debug(f"Rendered page '{parsed['displaytitle']}' at revision {parsed['revid']}")
+            return parsed['html'], parsed['sections']
+        logger.info(f"Page '{normalized_title}' is empty or not found. Creating new page with placeholder content.")
+        return wiki_api.convert_to_html(placeholder_content(page_title)), None
+
+    wiki_content = wiki_api.get_wiki_content(normalized_title)
+    if wiki_content == "":
+        logger.info(f"Page '{normalized_title}' is empty or not found. Creating new page with placeholder content.")
+        wiki_content = placeholder_content(page_title)
+
+    return wiki_api.convert_to_html(wiki_content), None
+
+def part_title(confluence_title, part):
+    return f"{confluence_title} (Part {part})"
+
+def iter_section_html(wiki_api, page):
+    """
+    Yield the rendered HTML of a page one top-level section at a time, pinned to the
+    page's revision. Each section includes its subsections, so peak memory follows the
+    largest top-level section rather than the whole page.
+    """
+    revid = page.get('lastrevid')
+    sections = wiki_api.get_page_sections(page['title'], revid)
+    if sections is None:
+        raise RuntimeError("Failed to fetch the section list")
+
+    # Headings from transcluded templates have non-numeric indexes and render inside their parent section
+    indexes = ['0'] + [
+        section['index'] for section in sections
+        if int(section.get('toclevel', 0)) == 1 and str(section.get('index', '')).isdigit()
+    ]
+    for index in indexes:
+        html_content = wiki_api.parse_section(page['title'], index, revid)
+        if html_content is None:
+            raise RuntimeError(f"Failed to render section {index}")
+        yield html_content
+        del html_content
+
+def iter_storage_blocks(confluence_api, html_chunks, max_size):
+    """
+    Yield storage HTML blocks of at most max_size characters, one section at a time.
+    Sections larger than max_size fall back to paragraph-level splitting.
+    """
+    for section in WikiConverter.iter_markdown_sections(html_chunks):
+        block = confluence_api.markdown_to_html(section)
+        if len(block) <= max_size:
+            yield block
+            continue
+
+        for paragraph in section.split('\n\n'):
+            if not paragraph.strip():
+                continue
+            block = confluence_api.markdown_to_html(paragraph + '\n\n')
+            if len(block) > max_size:
+                raise ValueError(f"A single paragraph of {len(block)} characters exceeds the {max_size} character limit")
+            yield block
+
+def process_large_page(confluence_api, confluence_title, html_chunks, config, parent_id):
+    """
+    Convert a large page section by section and upload it, splitting it into a
+    parent page plus child pages at heading boundaries when its storage HTML exceeds
+    max_body_size. Returns the number of pages uploaded, or 0 on failure.
+    """
+    space = config['confluence']['space_key']
+    max_body_size = config['confluence'].get('max_body_size', ConfluenceAPI.DEFAULT_MAX_BODY_SIZE)
+
+    # Reserve room for the children macro so the parent page also stays within the limit
+    blocks = iter_storage_blocks(confluence_api, html_chunks, max_body_size - len(CHILDREN_MACRO))
+    pages = WikiConverter.group_into_pages(blocks, max_body_size - len(CHILDREN_MACRO))
+
+    try:
+        body = next(pages, None)
+        if body is None:
+            logger.error(f"Failed to convert content to Markdown for page: {confluence_title}")
+            return 0
+
+        next_body = next(pages, None)
+        if next_body is not None:
+            logger.info(f"Page '{confluence_title}' exceeds {max_body_size} characters. Splitting into child pages.")
+            body += CHILDREN_MACRO
 
         page_id = confluence_api.create_or_update_page(
-            space=config['confluence']['space_key'],
-            title=confluence_title,
-            body=markdown_content,
-            parent_id=parent_id
+            space=space, title=confluence_title, body=body, parent_id=parent_id
         )
-        
+        del body
         if not page_id:
             logger.error(f"Failed to upload page to Confluence: {confluence_title}")
-            return False
+            return 0
+
+        part = 1
+        while next_body is not None:
+            part += 1
+            title = part_title(confluence_title, part)
+            if not confluence_api.create_or_update_page(
+                space=space, title=title, body=next_body, parent_id=page_id
+            ):
+                logger.error(f"Failed to upload page to Confluence: {title}")
+                return 0
+            next_body = next(pages, None)
+    except (ValueError, RuntimeError) as e:
+        logger.error(f"Failed to convert page '{confluence_title}' section by section: {e}")
+        return 0
+
+    return part
+
+def remove_stale_parts(confluence_api, space, confluence_title, parts, space_index):
+    # Remove child pages left over from an earlier run in which the page was split into more parts
+    part = parts + 1
+    while part_title(confluence_title, part) in space_index:
+        title = part_title(confluence_title, part)
+        if confluence_api.remove_page(space, title):
+            logger.info(f"Removed stale child page: {title}")
+        else:
+            logger.warning(f"Failed to remove stale child page: {title}")
+        part += 1
+
+def process_page(wiki_api, confluence_api, page, config, parent_id, space_index=None):
+    page_title = page['title']
+    normalized_title = page_title
+    try:
+        normalized_title = wiki_api.normalize_title(page_title)
+
+        space = config['confluence']['space_key']
+        confluence_title = normalized_title.replace('_', ' ')
+        max_body_size = config['confluence'].get('max_body_size', ConfluenceAPI.DEFAULT_MAX_BODY_SIZE)
+
+        parts = 0
+        # Pages whose wikitext already exceeds the body limit are never rendered in one piece
+        if page.get('length', 0) <= max_body_size:
+            html_content, sections = render_page(wiki_api, normalized_title, page_title, config)
+            if not html_content:
+                logger.error(f"Failed to convert content to HTML for page: {normalized_title}")
+                return False
+
+            markdown_content = WikiConverter.wiki_to_markdown(html_content, sections)
+            del html_content, sections
+            if not markdown_content:
+                logger.error(f"Failed to convert content to Markdown for page: {normalized_title}")
+                return False
+            body = confluence_api.markdown_to_html(markdown_content)
+            del markdown_content
+
+            if len(body) <= max_body_size:
+                page_id = confluence_api.create_or_update_page(
+                    space=space,
+                    title=confluence_title,
+                    body=body,
+                    parent_id=parent_id
+                )
+                if not page_id:
+                    logger.error(f"Failed to upload page to Confluence: {confluence_title}")
+                    return False
+                parts = 1
+            del body
+
+        if not parts:
+            html_chunks = iter_section_html(wiki_api, page)
+            parts = process_large_page(confluence_api, confluence_title, html_chunks, config, parent_id)
+            if not parts:
+                return False
+
+        if space_index is not None:
+            remove_stale_parts(confluence_api, space, confluence_title, parts, space_index)
+
+        # Record the revision only once every part is uploaded, so an incomplete page is never skipped
+        if page.get('lastrevid'):
+            entry = (space_index or {}).get(confluence_title) or {}
+            page_id = confluence_api.get_page_id(space, confluence_title)
+            if not confluence_api.set_migrated_revid(page_id, page['lastrevid'], entry.get('property_version')):
+                logger.warning(f"Failed to record migrated revision for page: {confluence_title}")
+            elif space_index is not None:
+                # Keep the property version current for colliding titles that write the same page later in the run
+                space_index[confluence_title] = dict(entry, id=page_id, property_version=(entry.get('property_version') or 0) + 1)
 
         logger.info(f"Successfully processed page: {confluence_title}")
         return True
@@ -58,7 +221,16 @@ def process_page(wiki_api, confluence_api, page_title, config, parent_id):
         logger.error(f"Unexpected error processing page {normalized_title}: {str(e)}")
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate MediaWiki pages to Confluence.")
+    parser.add_argument('--plan', action='store_true',
+                        help="Produce a migration plan with counts and a time estimate instead of migrating")
+    parser.add_argument('--force', action='store_true',
+                        help="Rewrite every page, including pages unchanged since their last upload")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     try:
         config = load_config()
         
@@ -79,8 +251,18 @@ def main():
             url=config['confluence']['url'],
             username=config['confluence']['username'],
             api_token=config['confluence']['api_token'],
-            rate_limit=100
+            rate_limit=config['confluence'].get('rate_limit', 100)
         )
+
+        if args.plan:
+            planner = MigrationPlanner(page_collector, confluence_api, config, force=args.force)
+            plan = planner.build_plan()
+            if plan is None:
+                logger.error("Failed to build migration plan.")
+                sys.exit(1)
+            logger.info(planner.format_plan(plan))
+            planner.save_plan_to_file(plan, "migration_plan.txt")
+            return
         
         wiki_page_id = config['confluence']['parent_page_id']
 
@@ -89,17 +271,33 @@ def main():
             logger.error(f"Parent Wiki folder with ID {wiki_page_id} not found in Confluence. Please check your configuration.")
             sys.exit(1)
 
-        # Collect all pages, including empty ones
-        all_pages = page_collector.collect_all_pages()
+        # Collect all pages, including empty ones, with the metadata needed to skip unchanged pages
+        page_info = page_collector.collect_page_info()
+        if page_info is None:
+            logger.error("Failed to fetch the complete list of wiki pages.")
+            sys.exit(1)
+        all_pages = [page['normalized_title'] for page in page_info]
+
+        space_index = confluence_api.get_space_index(config['confluence']['space_key'])
+        if space_index is None:
+            logger.error("Failed to fetch the Confluence page index.")
+            sys.exit(1)
         
         # Log the total number of pages
         logger.info(f"Total number of pages to process: {len(all_pages)}")
         
-        # Process all pages
-        for page_title in all_pages:
-            success = process_page(wiki_api, confluence_api, page_title, config, wiki_page_id)
+        # Process all pages, skipping those already migrated at the wiki's latest revision
+        skipped = 0
+        for page in page_info:
+            if not args.force and MigrationPlanner.is_unchanged(page, space_index):
+                skipped += 1
+                continue
+            success = process_page(wiki_api, confluence_api, page, config, wiki_page_id, space_index)
             if not success:
-                page_collector.add_unprocessed_page(page_title)
+                page_collector.add_unprocessed_page(page['normalized_title'])
+
+        if skipped:
+            logger.info(f"Skipped {skipped} pages already migrated at their latest revision")
 
         # Save the list of pages to a text file, including unprocessed pages
         page_collector.save_pages_to_file(all_pages, "wiki_pages.txt")
@@ -0,0 +1,152 @@
+import logging
+import math
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class MigrationPlanner:
+    # Throttled Confluence requests per page: get_page_id (new pages only), create/update and the revision property
+    CONFLUENCE_REQUESTS_PER_CREATE = 3
+    CONFLUENCE_REQUESTS_PER_UPDATE = 2
+    # Throttled Confluence requests per extra child page of a split page: get_page_id plus create/update
+    CONFLUENCE_REQUESTS_PER_PART = 2
+    # Wiki requests per written page for each render mode
+    WIKI_REQUESTS_PER_PAGE = {'title': 1, 'wikitext': 2}
+    # Large pages fetch their section list, then at least one section per child page
+    WIKI_REQUESTS_PER_LARGE_PAGE = 1
+    # Pages returned per request by generator=allpages with gaplimit=max for non-bot accounts
+    WIKI_INFO_BATCH_SIZE = 500
+    CONFLUENCE_INDEX_BATCH_SIZE = 100
+    # Assumed seconds per request when no latency is configured
+    DEFAULT_REQUEST_LATENCY = 0.5
+
+    def __init__(self, page_collector, confluence_api, config, force=False):
+        self.page_collector = page_collector
+        self.confluence_api = confluence_api
+        self.space_key = config['confluence']['space_key']
+        self.render_mode = config['mediawiki'].get('render_mode', 'wikitext')
+        self.max_body_size = config['confluence'].get('max_body_size', confluence_api.DEFAULT_MAX_BODY_SIZE)
+        self.wiki_latency = config['mediawiki'].get('request_latency', self.DEFAULT_REQUEST_LATENCY)
+        self.confluence_latency = config['confluence'].get('request_latency', self.DEFAULT_REQUEST_LATENCY)
+        self.force = force
+
+    @staticmethod
+    def is_unchanged(page, space_index):
+        """
+        Return True if the Confluence copy of a wiki page was fully migrated from the wiki's latest revision.
+        """
+        entry = space_index.get(page['normalized_title'].replace('_', ' '))
+        return bool(entry) and entry['revid'] is not None and entry['revid'] == page['lastrevid']
+
+    @staticmethod
+    def find_title_collisions(page_info):
+        """
+        Group wiki titles that map to the same Confluence title after normalization.
+        """
+        groups = defaultdict(list)
+        for page in page_info:
+            groups[page['normalized_title']].append(page['title'])
+        return {normalized: titles for normalized, titles in groups.items() if len(titles) > 1}
+
+    def estimate_parts(self, page):
+        # Wikitext size is a rough proxy for the rendered body size
+        return max(1, math.ceil(page['length'] / self.max_body_size))
+
+    def build_plan(self):
+        """
+        Build a migration plan from bulk page metadata and the Confluence space index,
+        without fetching any page bodies. Returns None if either list is incomplete.
+        """
+        page_info = self.page_collector.collect_page_info()
+        if page_info is None:
+            logger.error("Could not fetch the complete list of wiki pages")
+            return None
+        space_index = self.confluence_api.get_space_index(self.space_key)
+        if space_index is None:
+            logger.error(f"Could not build a complete page index for space '{self.space_key}'")
+            return None
+
+        create, update, skip = [], [], []
+        extra_parts = 0
+        wiki_requests = math.ceil(len(page_info) / self.WIKI_INFO_BATCH_SIZE)
+        seen = set()
+        for page in page_info:
+            confluence_title = page['normalized_title'].replace('_', ' ')
+            if not self.force and self.is_unchanged(page, space_index):
+                skip.append(confluence_title)
+                continue
+            # Colliding titles are written to the same Confluence page, so only the first one creates it
+            if confluence_title in space_index or confluence_title in seen:
+                update.append(confluence_title)
+            else:
+                create.append(confluence_title)
+            seen.add(confluence_title)
+            if page['length'] > self.max_body_size:
+                parts = self.estimate_parts(page)
+                extra_parts += parts - 1
+                wiki_requests += self.WIKI_REQUESTS_PER_LARGE_PAGE + parts
+            else:
+                wiki_requests += self.WIKI_REQUESTS_PER_PAGE.get(self.render_mode, 2)
+
+        confluence_requests = (
+            math.ceil(len(space_index) / self.CONFLUENCE_INDEX_BATCH_SIZE) + 1
+            + len(create) * self.CONFLUENCE_REQUESTS_PER_CREATE
+            + len(update) * self.CONFLUENCE_REQUESTS_PER_UPDATE
+            + extra_parts * self.CONFLUENCE_REQUESTS_PER_PART
+        )
+
+        rate_limit = self.confluence_api.rate_limit
+        # Requests run one after another, and the throttle only waits when a request finished early
+        confluence_seconds = confluence_requests * max(self.confluence_latency, 1.0 / rate_limit)
+
+        return {
+            "total_pages": len(page_info),
+            "create": create,
+            "update": update,
+            "skip": skip,
+            "extra_parts": extra_parts,
+            "collisions": self.find_title_collisions(page_info),
+            "total_bytes": sum(page['length'] for page in page_info),
+            "rate_limit": rate_limit,
+            "wiki_latency": self.wiki_latency,
+            "confluence_latency": self.confluence_latency,
+            "confluence_requests": confluence_requests,
+            "wiki_requests": wiki_requests,
+            "minimum_seconds": confluence_requests / rate_limit,
+            "projected_seconds": confluence_seconds + wiki_requests * self.wiki_latency
+        }
+
+    @staticmethod
+    def format_plan(plan):
+        lines = [
+            "Migration Plan:",
+            f"Total wiki pages: {plan['total_pages']}",
+            f"Pages to create: {len(plan['create'])}",
+            f"Pages to update: {len(plan['update'])}",
+            f"Pages to skip (already migrated at the latest revision): {len(plan['skip'])}",
+            f"Estimated extra child pages from splitting large pages: {plan['extra_parts']}",
+            f"Total wikitext size: {plan['total_bytes']} bytes",
+            f"Confluence requests: {plan['confluence_requests']} "
+            f"(throttled at {plan['rate_limit']}/s, assumed {plan['confluence_latency']}s each)",
+            f"Wiki requests: {plan['wiki_requests']} (assumed {plan['wiki_latency']}s each)",
+            f"Projected wall-clock time: {plan['projected_seconds'] / 60:.1f} minutes",
+            f"Lower bound from the Confluence throttle alone: {plan['minimum_seconds'] / 60:.1f} minutes",
+        ]
+
+        if plan['collisions']:
+            lines.append(f"\nTitle collisions after normalization: {len(plan['collisions'])}")
+            for normalized, titles in plan['collisions'].items():
+                lines.append(f"{normalized}: {', '.join(titles)}")
+        else:
+            lines.append("\nNo title collisions after normalization.")
+
+        return '\n'.join(lines) + '\n'
+
+    def save_plan_to_file(self, plan, filename):
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(self.format_plan(plan))
+            logger.info(f"Migration plan saved to {filename}")
+        except IOError as e:
+            logger.error(f"Error saving migration plan to file: {e}")
@@ -1,5 +1,5 @@
 import requests
-from functools import lru_cache
+from collections import OrderedDict
 import re
 import logging
 
@@ -7,11 +7,16 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 class WikiAPI:
+    CACHE_MAXSIZE = 1000
+    # Wikitext larger than this is not cached so it is released once converted
+    CACHE_CONTENT_LIMIT = 100000
+
     def __init__(self, api_url, wiki_url, verify_ssl=True):
         self.api_url = api_url
         self.wiki_url = wiki_url
         self.verify_ssl = verify_ssl
         self.session = requests.Session()
+        self._content_cache = OrderedDict()
         if not verify_ssl:
             requests.packages.urllib3.disable_warnings()
 
@@ -20,9 +25,20 @@ class WikiAPI:
         # Convert spaces to underscores and remove any invalid characters
         return re.sub(r'[^a-zA-Z0-9_./:;]', '', title.replace(' ', '_'))
 
-    @lru_cache(maxsize=1000)
     def get_wiki_content(self, page_title):
         normalized_title = self.normalize_title(page_title)
+        if normalized_title in self._content_cache:
+            self._content_cache.move_to_end(normalized_title)
+            return self._content_cache[normalized_title]
+
+        content = self._fetch_wiki_content(normalized_title)
+        if len(content) <= self.CACHE_CONTENT_LIMIT:
+            self._content_cache[normalized_title] = content
+            if len(self._content_cache) > self.CACHE_MAXSIZE:
+                self._content_cache.popitem(last=False)
+        return content
+
+    def _fetch_wiki_content(self, normalized_title):
         params = {
             "action": "query",
             "prop": "revisions",
@@ -76,6 +92,100 @@ class WikiAPI:
             logger.error(f"Error converting wiki to HTML: {e}")
             return None
 
+    def parse_page(self, page_title):
+        """
+        Render a page server-side by title in a single request.
+
+        Returns a dict with the rendered HTML, revision id, display title and
+        section list, an empty dict if the page does not exist, or None on error.
+        """
+        normalized_title = self.normalize_title(page_title)
+        params = {
+            "action": "parse",
+            "page": normalized_title,
+            "prop": "text|revid|displaytitle|sections",
+            "disablelimitreport": 1,
+            "format": "json"
+        }
+
+        try:
+            response = self.session.get(self.api_url, params=params, verify=self.verify_ssl)
+            response.raise_for_status()
+            data = response.json()
+
+            if 'error' in data:
+                if data['error'].get('code') == 'missingtitle':
+                    logger.info(f"Page '{normalized_title}' does not exist in the wiki. Creating new page.")
+                    return {}
+                logger.error(f"Error parsing page '{normalized_title}' from {self.wiki_url}: {data['error'].get('info')}")
+                return None
+
+            parsed = data['parse']
+            return {
+                "html": parsed['text']['*'],
+                "revid": parsed.get('revid'),
+                "displaytitle": parsed.get('displaytitle', normalized_title),
+                "sections": parsed.get('sections', [])
+            }
+        except requests.RequestException as e:
+            logger.error(f"Network error parsing page '{normalized_title}' from {self.wiki_url}: {e}")
+        except KeyError as e:
+            logger.error(f"Unexpected API response structure for '{normalized_title}' from {self.wiki_url}: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error parsing page '{normalized_title}' from {self.wiki_url}: {e}")
+        return None
+
+    def _parse(self, params, normalized_title):
+        # Run an action=parse request pinned to a revision, or to the current page when no revision is given
+        try:
+            response = self.session.get(self.api_url, params=params, verify=self.verify_ssl)
+            response.raise_for_status()
+            data = response.json()
+            if 'error' in data:
+                logger.error(f"Error parsing page '{normalized_title}' from {self.wiki_url}: {data['error'].get('info')}")
+                return None
+            return data['parse']
+        except requests.RequestException as e:
+            logger.error(f"Network error parsing page '{normalized_title}' from {self.wiki_url}: {e}")
+        except KeyError as e:
+            logger.error(f"Unexpected API response structure for '{normalized_title}' from {self.wiki_url}: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error parsing page '{normalized_title}' from {self.wiki_url}: {e}")
+        return None
+
+    def _parse_target(self, page_title, revid):
+        if revid:
+            return {"oldid": revid}
+        return {"page": self.normalize_title(page_title)}
+
+    def get_page_sections(self, page_title, revid=None):
+        """
+        Return the section list of a page without its rendered text, or None on error.
+        """
+        params = {"action": "parse", "prop": "sections", "format": "json"}
+        params.update(self._parse_target(page_title, revid))
+        parsed = self._parse(params, self.normalize_title(page_title))
+        if parsed is None:
+            return None
+        return parsed.get('sections', [])
+
+    def parse_section(self, page_title, section, revid=None):
+        """
+        Render a single section of a page, including its subsections. Returns the HTML or None on error.
+        """
+        params = {
+            "action": "parse",
+            "prop": "text",
+            "section": section,
+            "disablelimitreport": 1,
+            "format": "json"
+        }
+        params.update(self._parse_target(page_title, revid))
+        parsed = self._parse(params, self.normalize_title(page_title))
+        if parsed is None:
+            return None
+        return parsed['text']['*']
+
     def is_page_empty(self, page_title):
         content = self.get_wiki_content(page_title)
         return content.strip() == ""
\ No newline at end of file
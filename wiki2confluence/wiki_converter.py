@@ -3,6 +3,10 @@ import re
 from collections import defaultdict
 
 class WikiConverter:
+    # Largest rendered body that is parsed to check whether a page is empty
+    EMPTY_CHECK_LIMIT = 10000
+    CONTENT_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'div']
+
     @staticmethod
     def clean_title(title):
         # Remove any HTML tags
@@ -11,13 +15,28 @@ class WikiConverter:
         cleaned_title = cleaned_title.strip()
         return cleaned_title
 
+    @staticmethod
+    def html_to_text(html_content):
+        # Extract the visible text from an HTML fragment, dropping tags, comments and entities
+        soup = BeautifulSoup(html_content, 'html.parser')
+        text = soup.get_text().strip()
+        soup.decompose()
+        return text
+
+    @staticmethod
+    def is_empty_html(html_content, sections=None):
+        # A page with sections or a large body has content, so only small bodies are parsed for visible text
+        if sections or len(html_content) > WikiConverter.EMPTY_CHECK_LIMIT:
+            return False
+        return not WikiConverter.html_to_text(html_content)
+
     @staticmethod
     def create_anchor(text):
         # Create a Confluence-style anchor from text
         return re.sub(r'[^a-zA-Z0-9-]+', '-', text.lower()).strip('-')
 
     @staticmethod
-    def wiki_to_markdown(html_content):
+    def wiki_to_markdown(html_content, sections=None):
         soup = BeautifulSoup(html_content, 'html.parser')
         
         # Remove edit links
@@ -25,31 +44,13 @@ class WikiConverter:
             edit_link.decompose()
         
         markdown_content = []
-        toc_items = []
+        # Use the server-provided section list when available instead of re-deriving it from headings
+        toc_items = WikiConverter.sections_to_toc_items(sections) if sections is not None else []
         
-        def process_element(element):
-            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                level = int(element.name[1])
-                title = WikiConverter.clean_title(element.get_text())
-                anchor = WikiConverter.create_anchor(title)
-                toc_items.append((level, title, anchor))
-                return f"{'#' * level} {title}\n\n"
-            elif element.name == 'p':
-                return WikiConverter.process_paragraph(element)
-            elif element.name == 'ul':
-                # Skip the original table of contents
-                if element.find('li', text=re.compile('contents', re.IGNORECASE)):
-                    return ""
-                content = ''.join(f"* {WikiConverter.process_list_item(li)}\n" for li in element.find_all('li', recursive=False)) + "\n"
-                return content
-            elif element.name == 'ol':
-                return ''.join(f"{i}. {WikiConverter.process_list_item(li)}\n" for i, li in enumerate(element.find_all('li', recursive=False), 1)) + "\n"
-            else:
-                return element.get_text()
-
         # Process each element in the HTML while preserving structure
-        for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'div']):
-            markdown_content.append(process_element(element))
+        for element in soup.find_all(WikiConverter.CONTENT_TAGS):
+            markdown_content.append(WikiConverter.process_element(element, toc_items if sections is None else None))
+        soup.decompose()
         
         # Apply structural deduplication
         markdown_content = WikiConverter.remove_structural_duplicates(markdown_content)
@@ -60,6 +61,67 @@ class WikiConverter:
         
         return ''.join(markdown_content)
 
+    @staticmethod
+    def process_element(element, toc_items=None):
+        if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+            level = int(element.name[1])
+            title = WikiConverter.clean_title(element.get_text())
+            if toc_items is not None:
+                anchor = WikiConverter.create_anchor(title)
+                toc_items.append((level, title, anchor))
+            return f"{'#' * level} {title}\n\n"
+        elif element.name == 'p':
+            return WikiConverter.process_paragraph(element)
+        elif element.name == 'ul':
+            # Skip the original table of contents
+            if element.find('li', text=re.compile('contents', re.IGNORECASE)):
+                return ""
+            content = ''.join(f"* {WikiConverter.process_list_item(li)}\n" for li in element.find_all('li', recursive=False)) + "\n"
+            return content
+        elif element.name == 'ol':
+            return ''.join(f"{i}. {WikiConverter.process_list_item(li)}\n" for i, li in enumerate(element.find_all('li', recursive=False), 1)) + "\n"
+        elif element.find(WikiConverter.CONTENT_TAGS):
+            # Wrapper divs such as mw-parser-output and mw-heading are emitted through their children
+            return ""
+        else:
+            return element.get_text()
+
+    @staticmethod
+    def iter_markdown_sections(html_chunks):
+        """
+        Convert an iterable of HTML chunks to Markdown one chunk at a time, so only a
+        single chunk and its parse tree are held in memory. Exact duplicate sections
+        are dropped.
+        """
+        seen = set()
+        for chunk in html_chunks:
+            soup = BeautifulSoup(chunk, 'html.parser')
+            del chunk
+            for edit_link in soup.find_all('span', class_='mw-editsection'):
+                edit_link.decompose()
+            section = ''.join(WikiConverter.process_element(element) for element in soup.find_all(WikiConverter.CONTENT_TAGS))
+            soup.decompose()
+
+            key = hash(section)
+            if section.strip() and key not in seen:
+                seen.add(key)
+                yield section
+
+    @staticmethod
+    def group_into_pages(blocks, max_size):
+        # Group body blocks into page bodies of at most max_size characters, splitting only between blocks
+        buffer = []
+        size = 0
+        for block in blocks:
+            if buffer and size + len(block) > max_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+            buffer.append(block)
+            size += len(block)
+        if buffer:
+            yield ''.join(buffer)
+
     @staticmethod
     def process_paragraph(p_element):
         content = []
@@ -94,6 +156,19 @@ class WikiConverter:
                 content.append(str(child))
         return ''.join(content)
 
+    @staticmethod
+    def sections_to_toc_items(sections):
+        # Convert MediaWiki action=parse sections into (level, title, anchor) tuples
+        toc_items = []
+        for section in sections:
+            # Section lines are HTML, so strip tags and unescape entities the same way headings are
+            title = WikiConverter.html_to_text(section.get('line', ''))
+            if not title:
+                continue
+            level = int(section.get('level', section.get('toclevel', 1)))
+            toc_items.append((level, title, WikiConverter.create_anchor(title)))
+        return toc_items
+
     @staticmethod
     def generate_toc(toc_items):
         toc = []
@@ -111,7 +186,8 @@ class WikiConverter:
 
         for item in content:
             if item.startswith('#'):  # It's a heading
-                if current_heading:
+                # Content before the first heading is kept under the None key
+                if current_section:
                     sections[current_heading].append(''.join(current_section))
                 current_heading = item.strip()
                 current_section = [item]
@@ -119,7 +195,7 @@ class WikiConverter:
                 current_section.append(item)
 
         # Add the last section
-        if current_heading:
+        if current_section:
             sections[current_heading].append(''.join(current_section))
 
         # Keep only unique sections for each heading